@@ -1,5 +1,7 @@
 import math
-from typing import Callable, Dict, List, Optional
+import weakref
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
 class Node:
     def __init__(self, feature=None, threshold=None,
@@ -29,57 +31,73 @@ def extract_features(word: str) -> Dict[str, int]:
 
     Designed specifically for regular language induction and DFA learning.
     Returns a dictionary mapping feature names to integer values.
-    """
-
-    features: Dict[str, int] = {}
 
-    # Basic features
-    features['length'] = len(word)
-    features['length_mod2'] = len(word) % 2
-    features['length_mod3'] = len(word) % 3
+    The word is scanned only by the two counts and the four bigram checks;
+    prefix/suffix features are read from short slices taken once.
+    """
 
-    # Symbol counts
+    length = len(word)
     a_count = word.count('a')
     b_count = word.count('b')
-    features['a_count'] = a_count
-    features['b_count'] = b_count
-    features['a_parity'] = a_count % 2
-    features['b_parity'] = b_count % 2
-    features['a_mod3'] = a_count % 3
-    features['b_mod3'] = b_count % 3
-
-    # Positional features
-    features['starts_with_a'] = 1 if word.startswith('a') else 0
-    features['starts_with_b'] = 1 if word.startswith('b') else 0
-    features['ends_with_a'] = 1 if word.endswith('a') else 0
-    features['ends_with_b'] = 1 if word.endswith('b') else 0
-
-    # Substring pattern features
-    features['has_aa'] = 1 if 'aa' in word else 0
-    features['has_ab'] = 1 if 'ab' in word else 0
-    features['has_ba'] = 1 if 'ba' in word else 0
-    features['has_bb'] = 1 if 'bb' in word else 0
-
-    # Suffix bigram features
-    features['ends_with_aa'] = 1 if word.endswith('aa') else 0
-    features['ends_with_ab'] = 1 if word.endswith('ab') else 0
-    features['ends_with_ba'] = 1 if word.endswith('ba') else 0
-    features['ends_with_bb'] = 1 if word.endswith('bb') else 0
-
-    # Content comparison features
-    features['more_a_than_b'] = 1 if a_count > b_count else 0
-    features['equal_a_b'] = 1 if a_count == b_count else 0
-
-    return features
+    first = word[:1]
+    last = word[-1:]
+    last2 = word[-2:]
+
+    return {
+        # Basic features
+        'length': length,
+        'length_mod2': length % 2,
+        'length_mod3': length % 3,
+
+        # Symbol counts
+        'a_count': a_count,
+        'b_count': b_count,
+        'a_parity': a_count % 2,
+        'b_parity': b_count % 2,
+        'a_mod3': a_count % 3,
+        'b_mod3': b_count % 3,
+
+        # Positional features
+        'starts_with_a': 1 if first == 'a' else 0,
+        'starts_with_b': 1 if first == 'b' else 0,
+        'ends_with_a': 1 if last == 'a' else 0,
+        'ends_with_b': 1 if last == 'b' else 0,
+
+        # Substring pattern features
+        'has_aa': 1 if 'aa' in word else 0,
+        'has_ab': 1 if 'ab' in word else 0,
+        'has_ba': 1 if 'ba' in word else 0,
+        'has_bb': 1 if 'bb' in word else 0,
+
+        # Suffix bigram features
+        'ends_with_aa': 1 if last2 == 'aa' else 0,
+        'ends_with_ab': 1 if last2 == 'ab' else 0,
+        'ends_with_ba': 1 if last2 == 'ba' else 0,
+        'ends_with_bb': 1 if last2 == 'bb' else 0,
+
+        # Content comparison features
+        'more_a_than_b': 1 if a_count > b_count else 0,
+        'equal_a_b': 1 if a_count == b_count else 0,
+    }
 
 
 # Entropy and decision tree construction
 def entropy(labels: List[bool]) -> float:
     """Computes entropy of a set of boolean labels (True/False)."""
-    if len(labels) == 0:
+    return entropy_from_counts(sum(labels), len(labels))
+
+
+@lru_cache(maxsize=None)
+def entropy_from_counts(n_true: int, n: int) -> float:
+    """Computes entropy of n boolean labels of which n_true are True.
+
+    Counts are integers and repeat a lot across split evaluations
+    (especially in small nodes), so results are memoized.
+    """
+    if n == 0:
         return 0.0
 
-    p_true = sum(labels) / len(labels)
+    p_true = n_true / n
     p_false = 1 - p_true
 
     result = 0.0
@@ -91,44 +109,219 @@ def entropy(labels: List[bool]) -> float:
     return result
 
 
-def best_split(features_list: List[Dict[str, int]], labels: List[bool]):
-    """Finds the best split (feature, threshold) using information gain.
+def build_feature_matrix(
+    words: List[str],
+    feature_fn: Optional[Callable[[str], Dict[str, int]]] = None,
+) -> Tuple[List[List[int]], List[str]]:
+    """Computes features of all words once, stored column-major.
 
-    All features are evaluated.
-    Thresholds are usually in {0, 1}, but arbitrary numeric values are supported.
+    Returns (X, feature_names) where X[f][i] is the value of feature
+    feature_names[f] for words[i].
+    Random training sets repeat words a lot, so features are extracted
+    only once per distinct word.
     """
 
+    if feature_fn is None:
+        feature_fn = extract_features
+
+    cache: Dict[str, Dict[str, int]] = {}
+    features_list = []
+    for w in words:
+        f = cache.get(w)
+        if f is None:
+            f = cache[w] = feature_fn(w)
+        features_list.append(f)
+    if not features_list:
+        return [], []
+
+    feature_names = list(features_list[0].keys())
+    X = [[f[name] for f in features_list] for name in feature_names]
+    return X, feature_names
+
+
+def pack_bits(values: List[int]) -> int:
+    """Packs 0/1 values into one int bitset: bit i is set iff values[i] is truthy."""
+    buf = bytearray((len(values) + 7) // 8)
+    for i, v in enumerate(values):
+        if v:
+            buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _pack_rows(rows: List[int], n_total: int) -> int:
+    """Packs a list of row indices into an int bitset."""
+    buf = bytearray((n_total + 7) // 8)
+    for i in rows:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def build_bit_columns(X: List[List[int]]) -> List[Optional[int]]:
+    """Packs every binary (0/1) feature column into an int bitset over rows.
+
+    Most features of extract_features are binary; with a bitset per column,
+    counting a split is a bitwise AND followed by a popcount.
+    Non-binary columns get None and are scored by counting values instead.
+    """
+    return [pack_bits(column) if set(column) <= {0, 1} else None for column in X]
+
+
+def distinct_binary_features(bit_columns: List[Optional[int]]) -> List[int]:
+    """Returns indices of the features worth evaluating in best_split.
+
+    A binary column equal to an earlier binary column scores exactly the same
+    gain at every node, and best_split keeps the first of equal gains, so it
+    can never win a split. Such columns are left out. Complemented columns
+    are kept: their gain is summed with the sides swapped and may differ in
+    the last bit, which can change the chosen split.
+    """
+    seen = set()
+    active = []
+    for f, bits in enumerate(bit_columns):
+        if bits is not None:
+            if bits in seen:
+                continue
+            seen.add(bits)
+        active.append(f)
+    return active
+
+
+def build_value_ranks(
+    X: List[List[int]],
+    bit_columns: List[Optional[int]],
+) -> List[Optional[Tuple[List[int], List[int]]]]:
+    """Precomputes split thresholds of the non-binary features.
+
+    For every non-binary column returns (values, ranks): its sorted distinct
+    values (the candidate thresholds) and, per row, the index of the row's
+    value in that list. Binary columns get None, their only threshold is 0.
+    """
+    value_ranks: List[Optional[Tuple[List[int], List[int]]]] = []
+    for column, bits in zip(X, bit_columns):
+        if bits is not None:
+            value_ranks.append(None)
+            continue
+        values = sorted(set(column))
+        rank = {v: r for r, v in enumerate(values)}
+        value_ranks.append((values, [rank[v] for v in column]))
+    return value_ranks
+
+
+def _score_feature(
+    bits: Optional[int],
+    ranked: Optional[Tuple[List[int], List[int]]],
+    labels: List[bool],
+    rows: List[int],
+    n_true: int,
+    base_entropy: float,
+    row_labels: int,
+    row_mask: int,
+) -> Tuple[float, Optional[int]]:
+    """Returns (gain, threshold) of the best split on a single feature.
+
+    The threshold is None (and the gain -1) when no split is possible.
+    """
+
+    n = len(rows)
+    if bits is not None:
+        # binary feature: the only useful threshold is 0
+        n_ones = (row_mask & bits).bit_count()
+        if n_ones == 0 or n_ones == n:
+            return -1, None
+        n_left = n - n_ones
+        pos_left = n_true - (row_labels & bits).bit_count()
+        candidates = [(0, n_left, pos_left)]
+    else:
+        values, ranks = ranked
+        totals = [0] * len(values)
+        positives = [0] * len(values)
+        for i in rows:
+            r = ranks[i]
+            totals[r] += 1
+            if labels[i]:
+                positives[r] += 1
+
+        candidates = []
+        n_left = 0
+        pos_left = 0
+        for r, thr in enumerate(values):
+            if totals[r]:
+                n_left += totals[r]
+                pos_left += positives[r]
+                candidates.append((thr, n_left, pos_left))
+
     best_gain = -1
-    best_feature = None
     best_threshold = None
+    for thr, n_left, pos_left in candidates:
+        n_right = n - n_left
 
-    all_features = features_list[0].keys()
+        if n_left == 0 or n_right == 0:
+            continue
 
-    for feature in all_features:
-        values = [f[feature] for f in features_list]
-        thresholds = sorted(set(values))
+        left_entropy = entropy_from_counts(pos_left, n_left)
+        right_entropy = entropy_from_counts(n_true - pos_left, n_right)
 
-        for thr in thresholds:
-            left_labels = [labels[i] for i in range(len(labels)) if values[i] <= thr]
-            right_labels = [labels[i] for i in range(len(labels)) if values[i] > thr]
+        p_left = n_left / n
+        p_right = 1 - p_left
 
-            if len(left_labels) == 0 or len(right_labels) == 0:
-                continue
+        gain = base_entropy - (p_left * left_entropy + p_right * right_entropy)
+
+        if gain > best_gain:
+            best_gain = gain
+            best_threshold = thr
 
-            left_entropy = entropy(left_labels)
-            right_entropy = entropy(right_labels)
+    return best_gain, best_threshold
 
-            p_left = len(left_labels) / len(labels)
-            p_right = 1 - p_left
 
-            gain = entropy(labels) - (p_left * left_entropy + p_right * right_entropy)
+def best_split(
+    X: List[List[int]],
+    labels: List[bool],
+    rows: List[int],
+    bit_columns: Optional[List[Optional[int]]] = None,
+    label_bits: int = 0,
+    row_mask: int = 0,
+    features: Optional[List[int]] = None,
+    value_ranks: Optional[List[Optional[Tuple[List[int], List[int]]]]] = None,
+):
+    """Finds the best split (feature index, threshold) using information gain.
+
+    X           – column-major feature matrix (see build_feature_matrix)
+    rows        – indices of the samples reaching the current node
+    bit_columns – optional packed binary columns (see build_bit_columns),
+                  used together with label_bits (packed labels) and
+                  row_mask (packed rows)
+    features    – feature indices to evaluate (default: all)
+    value_ranks – precomputed thresholds of non-binary features
+                  (see build_value_ranks; computed here if not given)
 
-            if gain > best_gain:
-                best_gain = gain
-                best_feature = feature
-                best_threshold = thr
+    Thresholds are usually in {0, 1}, but arbitrary numeric values are supported.
+    Every feature is scored independently by _score_feature; the first
+    feature with the highest gain wins.
+    """
 
-    return best_feature, best_threshold
+    n = len(rows)
+    row_labels = 0
+    if bit_columns is None:
+        bit_columns = [None] * len(X)
+        n_true = sum(labels[i] for i in rows)
+    else:
+        row_labels = row_mask & label_bits
+        n_true = row_labels.bit_count()
+    base_entropy = entropy_from_counts(n_true, n)
+
+    if features is None:
+        features = range(len(X))
+    if value_ranks is None:
+        value_ranks = build_value_ranks(X, bit_columns)
+
+    best = (-1, None, None)
+    for f in features:
+        gain, thr = _score_feature(bit_columns[f], value_ranks[f], labels, rows,
+                                   n_true, base_entropy, row_labels, row_mask)
+        if thr is not None and gain > best[0]:
+            best = (gain, f, thr)
+
+    return best[1], best[2]
 
 
 def build_tree(
@@ -143,62 +336,159 @@ def build_tree(
     words      – list of input words
     labels     – corresponding True/False labels
     feature_fn – feature extraction function (default: extract_features)
-    """
 
-    if feature_fn is None:
-        feature_fn = extract_features
+    Features are computed once for all words. Nodes are then grown from an
+    explicit work stack of (node, rows, row_mask, depth) items instead of
+    recursion, where rows are indices into the feature matrix and row_mask
+    holds the same rows packed as a bitset.
+    """
 
-    # All labels identical → create a leaf
-    if all(l is True for l in labels):
-        return Node(value=True)
-    if all(l is False for l in labels):
-        return Node(value=False)
-
-    # Maximum depth reached → majority leaf
-    if depth >= max_depth:
-        majority = sum(labels) >= len(labels) / 2
-        return Node(value=majority)
-
-    # Compute feature vectors
-    features_list = [feature_fn(w) for w in words]
-
-    # Find the best split
-    feature, threshold = best_split(features_list, labels)
-
-    # No valid split → majority leaf
-    if feature is None:
-        majority = sum(labels) >= len(labels) / 2
-        return Node(value=majority)
-
-    # Partition the dataset
-    left_words: List[str] = []
-    left_labels: List[bool] = []
-    right_words: List[str] = []
-    right_labels: List[bool] = []
-
-    for i in range(len(words)):
-        if features_list[i][feature] <= threshold:
-            left_words.append(words[i])
-            left_labels.append(labels[i])
+    X, feature_names = build_feature_matrix(words, feature_fn)
+    labels = [bool(l) for l in labels]
+    bit_columns = build_bit_columns(X)
+    label_bits = pack_bits(labels)
+    features = distinct_binary_features(bit_columns)
+    value_ranks = build_value_ranks(X, bit_columns)
+
+    root = Node()
+    stack = [(root, list(range(len(labels))), (1 << len(labels)) - 1, depth)]
+    while stack:
+        node, rows, row_mask, node_depth = stack.pop()
+
+        n = len(rows)
+        n_true = (row_mask & label_bits).bit_count()
+
+        # All labels identical → create a leaf
+        if n_true == n:
+            node.value = True
+            continue
+        if n_true == 0:
+            node.value = False
+            continue
+
+        # Maximum depth reached → majority leaf
+        if node_depth >= max_depth:
+            node.value = n_true >= n / 2
+            continue
+
+        # Find the best split
+        f, threshold = best_split(X, labels, rows, bit_columns, label_bits, row_mask,
+                                  features, value_ranks)
+
+        # No valid split → majority leaf
+        if f is None:
+            node.value = n_true >= n / 2
+            continue
+
+        # Partition the row indices
+        column = X[f]
+        left_rows = [i for i in rows if column[i] <= threshold]
+        right_rows = [i for i in rows if column[i] > threshold]
+
+        bits = bit_columns[f]
+        if bits is not None:
+            left_mask = row_mask & ~bits
         else:
-            right_words.append(words[i])
-            right_labels.append(labels[i])
+            left_mask = _pack_rows(left_rows, len(labels))
+        right_mask = row_mask & ~left_mask
 
-    # Recursive construction
-    left_child = build_tree(left_words, left_labels, max_depth, depth + 1, feature_fn=feature_fn)
-    right_child = build_tree(right_words, right_labels, max_depth, depth + 1, feature_fn=feature_fn)
+        node.feature = feature_names[f]
+        node.threshold = threshold
+        node.left = Node()
+        node.right = Node()
+        stack.append((node.right, right_rows, right_mask, node_depth + 1))
+        stack.append((node.left, left_rows, left_mask, node_depth + 1))
 
-    return Node(feature=feature, threshold=threshold, left=left_child, right=right_child)
+    return root
 
 
 def predict_tree(node: Node, features: Dict[str, int]) -> bool:
-    """Evaluates the decision tree on a given feature dictionary."""
-    while True:
+    """Evaluates the decision tree on a given feature dictionary.
+
+    The tree is compiled to arrays once (see compile_tree) and cached per
+    root node, so it must not be modified after the first prediction.
+    """
+    if node.value is not None:
+        return bool(node.value)
+
+    entry = _COMPILED_TREES.get(node)
+    if entry is None:
+        names = _tree_feature_names(node)
+        entry = _COMPILED_TREES[node] = (compile_tree(node, names), names)
+
+    compiled, names = entry
+    return predict_compiled(compiled, [[features[name]] for name in names])[0]
+
+
+# Array-based (compiled) tree
+CompiledTree = Tuple[List[int], List[int], List[int], List[bool]]
+
+# root node -> (compiled tree, feature names of its columns), for predict_tree
+_COMPILED_TREES: "weakref.WeakKeyDictionary[Node, Tuple[CompiledTree, List[str]]]" = weakref.WeakKeyDictionary()
+
+
+def _tree_feature_names(root: Node) -> List[str]:
+    """Returns the features split on in the tree, in order of first use."""
+    names: Dict[str, None] = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.value is None:
+            names[node.feature] = None
+            stack.append(node.right)
+            stack.append(node.left)
+    return list(names)
+
+
+def compile_tree(root: Node, feature_names: List[str]) -> CompiledTree:
+    """Flattens a tree into parallel arrays (feat, thr, left, value).
+
+    Node 0 is the root. For an internal node idx, feat[idx] is the column
+    of its feature in feature_names and its children are stored next to each
+    other: left[idx] (feature <= threshold) and left[idx] + 1 (feature >
+    threshold). Leaves have feat == -1 and their label in value.
+    """
+
+    column = {name: f for f, name in enumerate(feature_names)}
+    feat: List[int] = [-1]
+    thr: List[int] = [0]
+    left: List[int] = [-1]
+    value: List[bool] = [False]
+
+    stack = [(root, 0)]
+    while stack:
+        node, idx = stack.pop()
         if node.value is not None:
-            return bool(node.value)
+            value[idx] = bool(node.value)
+            continue
 
-        val = features[node.feature]
-        if val <= node.threshold:
-            node = node.left
-        else:
-            node = node.right
+        child = len(feat)
+        feat[idx] = column[node.feature]
+        thr[idx] = node.threshold
+        left[idx] = child
+        feat += [-1, -1]
+        thr += [0, 0]
+        left += [-1, -1]
+        value += [False, False]
+        stack.append((node.right, child + 1))
+        stack.append((node.left, child))
+
+    return feat, thr, left, value
+
+
+def predict_compiled(compiled: CompiledTree, X: List[List[int]]) -> List[bool]:
+    """Evaluates a compiled tree on every row of a column-major feature matrix.
+
+    The step to a child is index arithmetic: left[idx] + (value > thr[idx]).
+    """
+
+    feat, thr, left, value = compiled
+    n = len(X[0]) if X else 0
+
+    out: List[bool] = []
+    for i in range(n):
+        idx = 0
+        while feat[idx] >= 0:
+            idx = left[idx] + (X[feat[idx]][i] > thr[idx])
+        out.append(value[idx])
+    return out
@@ -1,5 +1,6 @@
 import random
-from collections import defaultdict, deque
+from collections import deque
+from types import MappingProxyType
 
 
 class DFA:
@@ -17,14 +18,85 @@ class DFA:
         start_state - starting state
         accepting_states - a set of accepting states
         transitions - a dictionary: transitions[q][symbol] -> q_next
+                      (read-only view built from the transition table)
+
+    Internally every state gets an integer id (in order of appearance) and
+    transitions are stored in a dense table indexed by ids:
+    _table[state_id][symbol_id] -> next_state_id (-1 if the transition is missing).
+    Word walks use a completed copy of the table (see _walk_table) so that
+    the inner loop needs no missing-transition checks.
     """
     def __init__(self, alphabet=('a', 'b')):
         self.alphabet = tuple(alphabet)
         self.states = set()
         self.start_state = None
         self.accepting_states = set()
-        # transition dictionary
-        self.transitions = defaultdict(dict)
+        # dense transition table over integer ids
+        self._sym_id = {s: i for i, s in enumerate(self.alphabet)}
+        self._sym_lut = self._symbol_lut(self.alphabet)
+        self._state_id = {}
+        self._id_to_state = []
+        self._table = []
+        self._accepting = []
+        self._walk = None
+        self._n_transitions = 0  # number of defined entries in _table
+
+    @classmethod
+    def from_table(cls, alphabet, table, accepting, start=0):
+        """
+        Builds a DFA with states 0..n-1 straight from a dense table, without
+        going through add_state/add_transition per entry.
+        :param alphabet:
+        :param table: table[q][j] -> target of state q on alphabet[j] (-1 if missing);
+                      the rows are used as they are, not copied
+        :param accepting: accepting[q] -> whether state q is accepting
+        :param start: start state (None for no start state)
+        :return: the new DFA
+        """
+        dfa = cls(alphabet)
+        n = len(table)
+        dfa.states = set(range(n))
+        dfa._state_id = dict(zip(range(n), range(n)))
+        dfa._id_to_state = list(range(n))
+        dfa._table = table
+        dfa._accepting = [bool(a) for a in accepting]
+        dfa._n_transitions = n * len(dfa.alphabet) - sum(row.count(-1) for row in table)
+        dfa.accepting_states = {q for q in range(n) if dfa._accepting[q]}
+        dfa.start_state = start
+        return dfa
+
+    @staticmethod
+    def _symbol_lut(alphabet):
+        """
+        Byte -> symbol id table for bytes.translate, or None if some symbol is
+        not a single ASCII character (e.g. non-str symbols such as ints). Every other byte (including all bytes
+        of non-ASCII characters) maps to len(alphabet), the unknown column of
+        the walk table.
+        :param alphabet:
+        :return:
+        """
+        if not all(isinstance(a, str) and len(a) == 1 and a.isascii() for a in alphabet):
+            return None
+        lut = bytearray([len(alphabet)]) * 256
+        for i, a in enumerate(alphabet):
+            lut[ord(a)] = i
+        return bytes(lut)
+
+    def _ensure_id(self, state):
+        """
+        Returns the integer id of a state, allocating a new table row if needed
+        :param state:
+        :return: integer id of the state
+        """
+        sid = self._state_id.get(state)
+        if sid is None:
+            sid = len(self._table)
+            self._state_id[state] = sid
+            self._id_to_state.append(state)
+            self._table.append([-1] * len(self.alphabet))
+            self._accepting.append(state in self.accepting_states)
+            self._walk = None
+        return sid
 
     def add_state(self, state, accepting=False):
         """
@@ -34,8 +106,11 @@ class DFA:
         :return:
         """
         self.states.add(state)
+        sid = self._ensure_id(state)
         if accepting:
             self.accepting_states.add(state)
+            self._accepting[sid] = True
+            self._walk = None
 
     def set_start(self, state):
         """
@@ -44,7 +119,9 @@ class DFA:
         :return:
         """
         self.states.add(state)
+        self._ensure_id(state)
         self.start_state = state
+        self._walk = None
 
     def set_accepting_state(self, state, val=True):
         """
@@ -57,6 +134,10 @@ class DFA:
             self.accepting_states.add(state)
         else:
             self.accepting_states.discard(state)
+        sid = self._state_id.get(state)
+        if sid is not None:
+            self._accepting[sid] = bool(val)
+            self._walk = None
 
     def add_transition(self, q_old, symbol, q_new):
         """
@@ -67,11 +148,58 @@ class DFA:
         :param q_new:
         :return:
         """
-        if symbol not in self.alphabet:
+        j = self._sym_id.get(symbol)
+        if j is None:
             raise ValueError(f"Symbol {symbol} does not belong to the alphabet")
         self.states.add(q_old)
         self.states.add(q_new)
-        self.transitions[q_old][symbol] = q_new
+        row = self._table[self._ensure_id(q_old)]
+        if row[j] < 0:
+            self._n_transitions += 1
+        row[j] = self._ensure_id(q_new)
+        self._walk = None
+
+    def is_complete(self):
+        """
+        Checks that every (state, symbol) pair has a transition.
+        Uses the count of defined transitions kept by add_transition, so it is
+        a single comparison instead of a scan of the table.
+        :return:
+        """
+        return self._n_transitions == len(self._table) * len(self.alphabet)
+
+    def _walk_table(self):
+        """
+        Returns (table, accepting, start) completed for word walks, cached
+        until the automaton changes. An extra dead row takes every missing
+        transition and loops on itself, and an extra last column (index
+        len(alphabet)) sends symbols outside the alphabet to it as well, so
+        a walk is just s = table[s][sym_id.get(a, len(alphabet))].
+        :return:
+        """
+        if self._walk is None:
+            dead = len(self._table)
+            table = [[dead if t < 0 else t for t in row] + [dead] for row in self._table]
+            table.append([dead] * (len(self.alphabet) + 1))
+            start = self._state_id.get(self.start_state, dead)
+            self._walk = (table, self._accepting + [False], start)
+        return self._walk
+
+    @property
+    def transitions(self):
+        """
+        Read-only transition mapping transitions[q][symbol] -> q_next,
+        built from the transition table. Every state has an entry (empty if
+        it has no transitions); writing to it raises TypeError, use
+        add_transition instead
+        :return:
+        """
+        transitions = {}
+        for sid, row in enumerate(self._table):
+            transitions[self._id_to_state[sid]] = MappingProxyType({
+                a: self._id_to_state[nxt] for a, nxt in zip(self.alphabet, row) if nxt >= 0
+            })
+        return MappingProxyType(transitions)
 
     def step(self, state, symbol):
         """
@@ -80,7 +208,12 @@ class DFA:
         :param symbol:
         :return: returns state from symbol
         """
-        return self.transitions.get(state, {}).get(symbol, None)
+        sid = self._state_id.get(state)
+        j = self._sym_id.get(symbol)
+        if sid is None or j is None:
+            return None
+        nxt = self._table[sid][j]
+        return None if nxt < 0 else self._id_to_state[nxt]
 
     def accepts(self, word):
         """
@@ -90,63 +223,286 @@ class DFA:
         :param word:
         :return:
         """
-        s = self.start_state
-        for a in word:
-            s = self.step(s, a)
-            # if transition is missing
-            if s is None:
-                return False
-        return s in self.accepting_states
+        return self.accepts_many((word,))[0]
+
+    def accepts_many(self, words):
+        """
+        Batch accepting function.
+        Checks many words at once by walking the completed transition table
+        (two list indexes per symbol instead of two dict lookups). For ASCII
+        alphabets each str word is turned into symbol ids in one C-level
+        encode().translate() call; other words (any iterable of symbols) are
+        looked up symbol by symbol.
+        :param words: iterable of words
+        :return: list of booleans, one per word
+        """
+        table, accepting, start = self._walk_table()
+        lut = self._sym_lut
+        sym_get = self._sym_id.get
+        unknown = len(self.alphabet)
+
+        results = []
+        for word in words:
+            s = start
+            if lut is not None and isinstance(word, str):
+                for j in word.encode().translate(lut):
+                    s = table[s][j]
+            else:
+                for a in word:
+                    s = table[s][sym_get(a, unknown)]
+            results.append(accepting[s])
+        return results
+
+    def accepts_symbol_ids(self, symbol_ids, lengths):
+        """
+        Batch accepting function for words already encoded as symbol ids.
+        The words are stored back to back in symbol_ids (ids are positions in
+        self.alphabet) and lengths[i] is the length of the i-th word, so no
+        strings need to be built or decoded. Each word is walked over a slice
+        of symbol_ids; bytes (as returned by random_word_generator with
+        encoded=True) are the cheapest to slice and iterate.
+        :param symbol_ids: flat sequence of symbol ids of all words
+        :param lengths: word lengths
+        :return: list of booleans, one per word
+        """
+        table, accepting, start = self._walk_table()
+
+        results = []
+        pos = 0
+        for L in lengths:
+            s = start
+            end = pos + L
+            for j in symbol_ids[pos:end]:
+                s = table[s][j]
+            pos = end
+            results.append(accepting[s])
+        return results
+
+    def _agreements(self, other, words):
+        """
+        Walks self and other in lockstep over each word and yields True when
+        both give the same verdict (a missing transition rejects).
+        """
+        table1, accepting1, start1 = self._walk_table()
+        table2, accepting2, start2 = other._walk_table()
+        lut1, lut2 = self._sym_lut, other._sym_lut
+        sym_get1, sym_get2 = self._sym_id.get, other._sym_id.get
+        unknown1, unknown2 = len(self.alphabet), len(other.alphabet)
+
+        use_luts = lut1 is not None and lut2 is not None
+        for word in words:
+            s1, s2 = start1, start2
+            if use_luts and isinstance(word, str):
+                for c in word.encode():
+                    s1 = table1[s1][lut1[c]]
+                    s2 = table2[s2][lut2[c]]
+            else:
+                for a in word:
+                    s1 = table1[s1][sym_get1(a, unknown1)]
+                    s2 = table2[s2][sym_get2(a, unknown2)]
+            yield accepting1[s1] == accepting2[s2]
+
+    def agrees_on(self, other, words):
+        """
+        Returns True if self and other accept exactly the same words of the
+        given list; stops at the first disagreement.
+        """
+        return all(self._agreements(other, words))
+
+    def count_agreements(self, other, words):
+        """
+        Returns the number of words on which self and other give the same
+        verdict.
+        """
+        return sum(self._agreements(other, words))
 
     def minimize(self):
         """
         Minimizes the DFA using Hopcroft's algorithm.
         Returns a new minimized DFA.
+
+        Works on integer state ids: blocks of the partition are sets of ids,
+        block_of[q] gives the block of state q, and inverse transitions
+        inv[c][q] list the predecessors of q on symbol c, so each refinement
+        step only touches states that actually move into the splitter.
+        A split always moves the smaller half to a new block, which keeps
+        relabeling (and the worklist) proportional to the smaller half.
+        Missing transitions lead to an implicit dead state, which is dropped
+        again when the minimized DFA is built.
         """
-        P = [set(self.accepting_states), self.states - set(self.accepting_states)]
-        W = [set(self.accepting_states)]
+        table = self._table
+        k = len(self.alphabet)
+        n = len(table)
+        dead = n
+        accepting = self._accepting + [False]
+
+        # inverse transitions: inv[c][q] -> predecessors of q on symbol c
+        inv = [[[] for _ in range(n + 1)] for _ in range(k)]
+        for q in range(n):
+            row = table[q]
+            for c in range(k):
+                t = row[c]
+                inv[c][t if t >= 0 else dead].append(q)
+        for c in range(k):
+            inv[c][dead].append(dead)
+
+        # initial partition: accepting / non-accepting
+        blocks = []
+        block_of = [0] * (n + 1)
+        for members in ({q for q in range(n + 1) if accepting[q]},
+                        {q for q in range(n + 1) if not accepting[q]}):
+            if members:
+                for q in members:
+                    block_of[q] = len(blocks)
+                blocks.append(members)
+
+        # worklist of (block id, symbol id) splitters; pending[b * k + c]
+        # flags whether (b, c) is currently in the worklist
+        W = []
+        pending = bytearray(k * (n + 1))
+        if len(blocks) == 2:
+            smaller = 0 if len(blocks[0]) <= len(blocks[1]) else 1
+            for c in range(k):
+                W.append((smaller, c))
+                pending[smaller * k + c] = 1
 
         while W:
-            A = W.pop()
-            for c in self.alphabet:
-                X = {q for q in self.states if self.step(q, c) in A}
-
-                newP = []
-                for Y in P:
-                    i = X & Y
-                    d = Y - X
-                    if i and d:
-                        newP.append(i)
-                        newP.append(d)
-                        if Y in W:
-                            W.remove(Y)
-                            W.append(i)
-                            W.append(d)
-                        else:
-                            W.append(i if len(i) <= len(d) else d)
-                    else:
-                        newP.append(Y)
-                P = newP
-
-        # Build minimized DFA
+            A, c = W.pop()
+            pending[A * k + c] = 0
+
+            # states moving into A on c, grouped by their current block
+            touched = {}
+            inv_c = inv[c]
+            for p in blocks[A]:
+                for q in inv_c[p]:
+                    touched.setdefault(block_of[q], []).append(q)
+
+            for Y, inside in touched.items():
+                block = blocks[Y]
+                if len(inside) == len(block):
+                    continue
+
+                # split Y: the smaller half moves to a new block, so only
+                # the smaller half has to be relabeled
+                inside = set(inside)
+                if 2 * len(inside) <= len(block):
+                    small = inside
+                    block -= inside
+                else:
+                    small = block - inside
+                    blocks[Y] = inside
+                new_id = len(blocks)
+                blocks.append(small)
+                for q in small:
+                    block_of[q] = new_id
+
+                # if (Y, a) is pending it now stands for the larger half and
+                # the new half has to be added; otherwise the smaller half is
+                # added - both cases push the new block
+                for a in range(k):
+                    W.append((new_id, a))
+                    pending[new_id * k + a] = 1
+
+        # Build minimized DFA (the block holding only the dead state is skipped)
+        dead_block = block_of[dead] if len(blocks[block_of[dead]]) == 1 else None
         mapping = {}
-        for i, block in enumerate(P):
-            for s in block:
-                mapping[s] = i
+        for b in range(len(blocks)):
+            if b != dead_block:
+                mapping[b] = len(mapping)
 
-        new = DFA(self.alphabet)
-        for old, new_id in mapping.items():
-            new.add_state(new_id, old in self.accepting_states)
+        new_table = []
+        new_accepting = []
+        for b in mapping:
+            q = next(iter(blocks[b]))
+            new_accepting.append(accepting[q])
+            row = table[q] if q != dead else [dead] * k
+            new_row = []
+            for t in row:
+                target = block_of[t if t >= 0 else dead]
+                new_row.append(-1 if target == dead_block else mapping[target])
+            new_table.append(new_row)
 
-        new.set_start(mapping[self.start_state])
+        start = None
+        if self.start_state is not None:
+            start = mapping[block_of[self._state_id[self.start_state]]]
+        return DFA.from_table(self.alphabet, new_table, new_accepting, start)
 
-        for q in self.states:
-            for a in self.alphabet:
-                nxt = self.step(q, a)
-                if nxt is not None:
-                    new.add_transition(mapping[q], a, mapping[nxt])
+    def agrees_up_to(self, other, max_len, min_len=0):
+        """
+        Returns True if self and other give the same verdict on every word over
+        self.alphabet with min_len <= length <= max_len. Lengths count alphabet
+        symbols, not characters, so a multi-character symbol adds 1.
+        Exact (no sampling) and without enumerating words: the walk goes level
+        by level over the set of state pairs reachable by words of each length
+        (at most |Q1| * |Q2| pairs per level). Once a checked level repeats,
+        all longer levels repeat too, so the walk stops early.
+        :param other:
+        :param max_len:
+        :param min_len:
+        :return:
+        """
+        table1, accepting1, start1 = self._walk_table()
+        table2, accepting2, start2 = other._walk_table()
+        unknown2 = len(other.alphabet)
+        columns = [(j, other._sym_id.get(a, unknown2)) for j, a in enumerate(self.alphabet)]
 
-        return new
+        level = {(start1, start2)}
+        seen = set()
+        for length in range(max_len + 1):
+            if length >= min_len:
+                for p, q in level:
+                    if accepting1[p] != accepting2[q]:
+                        return False
+                key = frozenset(level)
+                if key in seen:
+                    return True
+                seen.add(key)
+            level = {(table1[p][j], table2[q][j2]) for p, q in level for j, j2 in columns}
+        return True
+
+    def _product_pairs(self, other):
+        """
+        Breadth-first walk over the reachable pairs of the product automaton.
+        A pair of state ids (p, q) is encoded as the single int p * n2 + q
+        (n2 = number of states of other), so the BFS only deals with ints and
+        a bytearray of visited flags.
+        Pairs whose transition is missing in either DFA are not followed.
+        :param other:
+        :return: yields (p, q, [(symbol, p_next, q_next), ...]) with state ids
+        """
+        p0 = self._state_id.get(self.start_state)
+        q0 = other._state_id.get(other.start_state)
+        if p0 is None or q0 is None:
+            return
+
+        table1 = self._table
+        table2 = other._table
+        n2 = len(table2)
+        columns = [(a, j, other._sym_id.get(a)) for j, a in enumerate(self.alphabet)]
+
+        visited = bytearray(len(table1) * n2)
+        start = p0 * n2 + q0
+        visited[start] = 1
+        queue = deque([start])
+
+        while queue:
+            p, q = divmod(queue.popleft(), n2)
+            row1 = table1[p]
+            row2 = table2[q]
+            edges = []
+            for a, j, j2 in columns:
+                if j2 is None:
+                    continue
+                p_next = row1[j]
+                q_next = row2[j2]
+                if p_next < 0 or q_next < 0:
+                    continue
+                edges.append((a, p_next, q_next))
+                code = p_next * n2 + q_next
+                if not visited[code]:
+                    visited[code] = 1
+                    queue.append(code)
+            yield p, q, edges
 
     def product(self, other):
         """
@@ -157,26 +513,18 @@ class DFA:
 
         start = (self.start_state, other.start_state)
         prod.set_start(start)
+        if self.start_state not in self._state_id or other.start_state not in other._state_id:
+            disagree = (self.start_state in self.accepting_states) != (other.start_state in other.accepting_states)
+            prod.add_state(start, accepting=disagree)
+            return prod
 
-        queue = deque([start])
-        visited = set([start])
-
-        while queue:
-            s1, s2 = queue.popleft()
-
-            disagree = (s1 in self.accepting_states) != (s2 in other.accepting_states)
-            prod.add_state((s1, s2), accepting=disagree)
-
-            for a in self.alphabet:
-                n1 = self.step(s1, a)
-                n2 = other.step(s2, a)
-                if n1 is None or n2 is None:
-                    continue
-                nxt = (n1, n2)
-                prod.add_transition((s1, s2), a, nxt)
-                if nxt not in visited:
-                    visited.add(nxt)
-                    queue.append(nxt)
+        names1 = self._id_to_state
+        names2 = other._id_to_state
+        for p, q, edges in self._product_pairs(other):
+            state = (names1[p], names2[q])
+            prod.add_state(state, accepting=self._accepting[p] != other._accepting[q])
+            for a, p_next, q_next in edges:
+                prod.add_transition(state, a, (names1[p_next], names2[q_next]))
 
         return prod
 
@@ -184,20 +532,16 @@ class DFA:
         """
         Two DFAs are equivalent if in the product automaton
         there is NO accepting state (disagreement).
+        The product is explored on the fly (without building it) and the
+        search stops at the first disagreement.
         """
-        prod = self.product(other)
+        if self.start_state not in self._state_id or other.start_state not in other._state_id:
+            return (self.start_state in self.accepting_states) == (other.start_state in other.accepting_states)
 
-        queue = deque([prod.start_state])
-        visited = set([prod.start_state])
-
-        while queue:
-            q = queue.popleft()
-            if q in prod.accepting_states:  # disagreement
+        accepting1 = self._accepting
+        accepting2 = other._accepting
+        for p, q, _edges in self._product_pairs(other):
+            if accepting1[p] != accepting2[q]:  # disagreement
                 return False
-            for a in prod.alphabet:
-                nxt = prod.step(q, a)
-                if nxt and nxt not in visited:
-                    visited.add(nxt)
-                    queue.append(nxt)
 
         return True
@@ -1,30 +1,54 @@
+import math
 import random
+from itertools import accumulate
 from typing import Iterable, List, Tuple
 
 from dfa import DFA
-from languages.registry import get_language
+from languages.registry import teacher_dfa_cached
 
 
-def random_word_generator(n, min_len=1, max_len=10, alphabet=('a', 'b')):
+def _random_symbol_ids(n, min_len, max_len, n_symbols):
+    """
+    Draws n random word lengths and the symbol ids of all words
+    (stored back to back) with two batched random.choices calls.
+    :return: (lengths, symbol_ids)
+    """
+    lengths = random.choices(range(min_len, max_len + 1), k=n)
+    symbol_ids = random.choices(range(n_symbols), k=sum(lengths))
+    return lengths, symbol_ids
+
+
+def _words_from_symbol_ids(symbol_ids, lengths, alphabet):
+    """Cuts a flat sequence of symbol ids into words (strings)."""
+    symbols = list(map(alphabet.__getitem__, symbol_ids))
+    return ["".join(symbols[end - L:end]) for end, L in zip(accumulate(lengths), lengths)]
+
+
+def random_word_generator(n, min_len=1, max_len=10, alphabet=('a', 'b'), encoded=False):
     """
     Generates n random words where word length is between min_len and max_len.
+    All lengths and all symbols are drawn in two batched random.choices calls;
+    the flat symbol sequence is then cut into words.
     :param n: number of words to generate
     :param min_len: min word length
     :param max_len: max word length
     :param alphabet: alphabet of symbols
-    :return: list of generated words (string)
+    :param encoded: also return the words encoded as symbol ids, ready for
+                    DFA.accepts_symbol_ids
+    :return: list of generated words (string), or (words, symbol_ids, lengths)
+             if encoded, where symbol_ids are the ids of all words back to
+             back as bytes
     """
-    words = []
-    for _ in range(n):
-        L = random.randint(min_len, max_len)
-        word = "".join(random.choice(alphabet) for _ in range(L))
-        words.append(word)
+    lengths, symbol_ids = _random_symbol_ids(n, min_len, max_len, len(alphabet))
+    words = _words_from_symbol_ids(symbol_ids, lengths, tuple(alphabet))
+    if encoded:
+        return words, bytes(symbol_ids), lengths
     return words
 
 
 def even_a_dfa():
     """Creates a reference DFA that accepts words with even number of 'a'."""
-    return get_language("even_a").teacher_dfa()
+    return teacher_dfa_cached("even_a")
 
 
 def label_words(dfa: DFA, words: Iterable[str]) -> List[Tuple[str, bool]]:
@@ -32,7 +56,39 @@ def label_words(dfa: DFA, words: Iterable[str]) -> List[Tuple[str, bool]]:
     Labels words using any DFA.
     Returns list of (word, label) pairs.
     """
-    return [(w, dfa.accepts(w)) for w in words]
+    words = list(words)
+    return list(zip(words, dfa.accepts_many(words)))
+
+
+def _inject_false_positives(true_labels: List[bool], fp_rate: float) -> List[bool]:
+    """Flips each negative label to True with probability fp_rate.
+
+    Instead of drawing one random number per negative example, the gap to
+    the next flipped negative is drawn from a geometric distribution, so the
+    number of draws is proportional to the number of flips.
+    """
+    noisy = list(true_labels)
+    negatives = [i for i, lbl in enumerate(true_labels) if not lbl]
+    if fp_rate <= 0.0 or not negatives:
+        return noisy
+    if fp_rate >= 1.0:
+        for i in negatives:
+            noisy[i] = True
+        return noisy
+
+    # log1p keeps tiny rates from rounding to log(1.0) == 0
+    log_keep = math.log1p(-fp_rate)
+    if log_keep == 0.0:
+        return noisy
+
+    pos = -1
+    while True:
+        # the gap may be huge (or inf) for tiny rates, so compare it as a float
+        gap = math.log(1.0 - random.random()) / log_keep
+        if gap >= len(negatives) - pos - 1:
+            return noisy
+        pos += 1 + int(gap)
+        noisy[negatives[pos]] = True
 
 
 def label_words_with_fp(dfa: DFA, words: Iterable[str], fp_rate: float = 0.1, seed=None) -> List[Tuple[str, bool]]:
@@ -52,15 +108,9 @@ def label_words_with_fp(dfa: DFA, words: Iterable[str], fp_rate: float = 0.1, se
     if seed is not None:
         random.seed(seed)
 
-    labeled: List[Tuple[str, bool]] = []
-    for w in words:
-        true_label = dfa.accepts(w)
-        if (not true_label) and random.random() < fp_rate:
-            labeled.append((w, True))
-        else:
-            labeled.append((w, true_label))
-
-    return labeled
+    words = list(words)
+    noisy = _inject_false_positives(dfa.accepts_many(words), fp_rate)
+    return list(zip(words, noisy))
 
 
 def label_words_with_fp_verbose(dfa: DFA, words: Iterable[str], fp_rate: float = 0.1, seed=None):
@@ -78,27 +128,27 @@ def label_words_with_fp_verbose(dfa: DFA, words: Iterable[str], fp_rate: float =
     if seed is not None:
         random.seed(seed)
 
-    data = []
-    for w in words:
-        true_label = dfa.accepts(w)
-        noisy_label = true_label
-        if (not true_label) and random.random() < fp_rate:
-            noisy_label = True
-        data.append((w, true_label, noisy_label))
-
-    return data
+    words = list(words)
+    true_labels = dfa.accepts_many(words)
+    noisy = _inject_false_positives(true_labels, fp_rate)
+    return list(zip(words, true_labels, noisy))
 
 
 def generate_labeled_words(language_name: str, n: int, min_len=1, max_len=10, seed=None):
     """Convenience helper used by training and tests.
 
     Generates n random words and labels them using the language's teacher DFA.
+    Words are generated as symbol ids and labeled in that form.
     """
     if seed is not None:
         random.seed(seed)
 
-    lang = get_language(language_name)
-    words = random_word_generator(n, min_len=min_len, max_len=max_len, alphabet=lang.ALPHABET)
-    teacher = lang.teacher_dfa()
-    labels = [teacher.accepts(w) for w in words]
+    teacher = teacher_dfa_cached(language_name)
+    alphabet = teacher.alphabet
+
+    # the teacher walks the generated symbol ids directly; strings are only
+    # built for the returned word list
+    lengths, symbol_ids = _random_symbol_ids(n, min_len, max_len, len(alphabet))
+    labels = teacher.accepts_symbol_ids(symbol_ids, lengths)
+    words = _words_from_symbol_ids(symbol_ids, lengths, alphabet)
     return words, labels, teacher
@@ -4,10 +4,11 @@ Each language module exposes:
     ALPHABET: tuple[str, ...]
     DEFAULT_MAX_LEN: int
     teacher_dfa() -> DFA
+    normal_form(word) -> Hashable   (optional)
 
 This package provides a small registry for dynamic loading.
 """
 
-from .registry import get_language, list_languages
+from .registry import get_language, list_languages, normal_form_fn, teacher_dfa_cached
 
-__all__ = ["get_language", "list_languages"]
+__all__ = ["get_language", "list_languages", "normal_form_fn", "teacher_dfa_cached"]
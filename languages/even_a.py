@@ -31,5 +31,13 @@ def teacher_dfa():
     return d
 
 
+def normal_form(word):
+    """Membership depends only on the parity of the a-count (None: foreign symbols)."""
+    a_count = word.count("a")
+    if a_count + word.count("b") != len(word):
+        return None
+    return a_count % 2
+
+
 def describe():
     return "Words over {a,b} with even number of 'a'."
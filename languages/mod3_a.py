@@ -33,5 +33,13 @@ def teacher_dfa():
     return d
 
 
+def normal_form(word):
+    """Membership depends only on the residue mod 3 of the a-count (None: foreign symbols)."""
+    a_count = word.count("a")
+    if a_count + word.count("b") != len(word):
+        return None
+    return a_count % 3
+
+
 def describe():
     return "Words over {a,b} with number of 'a' divisible by 3."
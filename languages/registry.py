@@ -3,13 +3,16 @@ Allows selecting a target regular language by name.
 
 Each language lives in a module under "languages/" and must define:
     NAME, ALPHABET, DEFAULT_MAX_LEN, teacher_dfa().
+It may also define normal_form(word) -> hashable key such that words with
+equal keys are either both in the language or both outside it.
 """
 
 from __future__ import annotations
 
 import importlib
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List
 
 
 @dataclass(frozen=True)
@@ -34,6 +37,7 @@ def list_languages() -> List[str]:
     return [s.name for s in LANGUAGES]
 
 
+@lru_cache(maxsize=None)
 def get_language(name: str) -> Any:
     """Loads and returns the language module by name."""
     name = name.strip()
@@ -43,3 +47,28 @@ def get_language(name: str) -> Any:
     raise ValueError(
         f"Unknown language: {name!r}. Available: {', '.join(list_languages())}"
     )
+
+
+def _identity(word: str) -> Hashable:
+    return word
+
+
+def normal_form_fn(name: str) -> Callable[[str], Hashable]:
+    """Returns the language's normal_form hook (the word itself by default)."""
+    return getattr(get_language(name), "normal_form", _identity)
+
+
+# Teacher DFAs are never modified after construction, so one instance
+# per language can be shared by all callers.
+_DFA_CACHE: Dict[str, Any] = {}
+
+
+def teacher_dfa_cached(name: str) -> Any:
+    """Returns the language's teacher DFA, building it only on first use.
+
+    The returned DFA is shared and must not be modified.
+    """
+    dfa = _DFA_CACHE.get(name)
+    if dfa is None:
+        dfa = _DFA_CACHE[name] = get_language(name).teacher_dfa()
+    return dfa
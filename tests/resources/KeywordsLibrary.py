@@ -11,8 +11,9 @@ Keywords are exposed as function names by Robot.
 import os
 import sys
 import random
+import functools
 from itertools import product
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 # ensure project root is on PYTHONPATH
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -20,20 +21,91 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from languages.registry import list_languages, get_language
+from languages.registry import normal_form_fn as _normal_form_fn
+from languages.registry import teacher_dfa_cached as _teacher_dfa_cached
 from generator import random_word_generator
+from generator import label_words_with_fp as _label_words_with_fp
 from decision_tree import build_tree
+from decision_tree import predict_tree as _predict_tree
+from decision_tree import extract_features as _extract_features
 from tree_to_dfa import tree_to_dfa
+import tree_to_dfa as _ttd
+from dfa import DFA as _DFA
 
 
-_TEACHERS: Dict[str, object] = {}
 _MODELS: Dict[str, object] = {}
+_DFAS: Dict[str, object] = {}
+_WORD_CACHE: Dict[tuple, Tuple[List[str], bytes, List[int]]] = {}
+_TEACHERS: Dict[str, "CachedAcceptor"] = {}
+
+# random test words drawn by train_language after the training words
+N_TEST_WORDS = 1000
+# largest word level _iter_words keeps in memory
+_SUFFIX_BLOCK_WORDS = 4096
+
+
+class CachedAcceptor:
+    """Wraps a DFA and caches accepts() per normal form of the word.
+
+    Words with the same normal form share one DFA walk. All other attributes
+    are delegated to the wrapped DFA.
+    """
+
+    def __init__(self, dfa, normal_form):
+        self._dfa = dfa
+        self._normal_form = normal_form
+        self._cache: Dict[object, bool] = {}
+
+    def accepts(self, word: str) -> bool:
+        key = self._normal_form(word)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._cache[key] = self._dfa.accepts(word)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._dfa, name)
 
 
 def _get_teacher(language_name: str):
-    if language_name not in _TEACHERS:
-        lang = get_language(language_name)
-        _TEACHERS[language_name] = lang.teacher_dfa()
-    return _TEACHERS[language_name]
+    teacher = _TEACHERS.get(language_name)
+    if teacher is None:
+        teacher = _TEACHERS[language_name] = CachedAcceptor(
+            _teacher_dfa_cached(language_name), _normal_form_fn(language_name))
+    return teacher
+
+
+@functools.lru_cache(maxsize=None)
+def _accepts(dfa_id: str, word: str) -> bool:
+    """Membership query of a learned DFA memoized per (dfa id, word)."""
+    return _DFAS[dfa_id].accepts(word)
+
+
+def _cached_words(n: int, min_len: int, max_len: int, alphabet: Tuple[str, ...], seed: int):
+    """Random words for a seed, generated once per (n, min_len, max_len, alphabet, seed).
+
+    Returns (words, symbol_ids, lengths) as random_word_generator(encoded=True).
+    """
+    key = (n, min_len, max_len, tuple(alphabet), seed)
+    if key not in _WORD_CACHE:
+        random.seed(seed)
+        _WORD_CACHE[key] = random_word_generator(n, min_len=min_len, max_len=max_len, alphabet=alphabet, encoded=True)
+    return _WORD_CACHE[key]
+
+
+def _train_test_words(language_name: str, n_train: int, max_len: int, seed: int) -> Tuple[List[str], List[str]]:
+    """Training and test words, drawn in one batch for the seed and split."""
+    alphabet = _get_teacher(language_name).alphabet
+    words, _symbol_ids, _lengths = _cached_words(n_train + N_TEST_WORDS, 1, max_len, alphabet, seed)
+    return words[:n_train], words[n_train:]
+
+
+def _training_labels(language_name: str, n_train: int, max_len: int, seed: int) -> List[bool]:
+    """Teacher labels of the training words, computed on their encoded form."""
+    teacher = _get_teacher(language_name)
+    _words, symbol_ids, lengths = _cached_words(n_train + N_TEST_WORDS, 1, max_len, teacher.alphabet, seed)
+    n_symbols = sum(lengths[:n_train])
+    return teacher.accepts_symbol_ids(symbol_ids[:n_symbols], lengths[:n_train])
 
 
 def _ensure_trained(language_name: str, n_train: int = 2000, max_len: int = 10, seed: int = 123):
@@ -42,27 +114,48 @@ def _ensure_trained(language_name: str, n_train: int = 2000, max_len: int = 10,
     if key in _MODELS:
         return _MODELS[key]
 
-    random.seed(seed)
     lang = get_language(language_name)
     teacher = _get_teacher(language_name)
 
-    words = random_word_generator(n_train, min_len=1, max_len=max_len, alphabet=lang.ALPHABET)
-    labels = [teacher.accepts(w) for w in words]
+    words, _test_words = _train_test_words(language_name, n_train, max_len, seed)
+    labels = _training_labels(language_name, n_train, max_len, seed)
 
     tree = build_tree(words, labels, max_depth=12)
     learned = tree_to_dfa(tree, max_len=max_len, alphabet=lang.ALPHABET)
+    _DFAS[f"learned|{key}"] = learned
 
     _MODELS[key] = (teacher, learned, words, labels)
     return _MODELS[key]
 
 
-def _all_words(alphabet: Tuple[str, ...], max_len: int) -> List[str]:
-    """Enumerates all words over alphabet with lengths 0..max_len."""
-    out = [""]
-    for L in range(1, max_len + 1):
-        for tup in product(alphabet, repeat=L):
-            out.append("".join(tup))
-    return out
+def _learned_id(language_name: str, n_train: int, max_len: int, seed: int) -> str:
+    """Returns the learned DFA id for _accepts, training if needed."""
+    _ensure_trained(language_name, n_train=n_train, max_len=max_len, seed=seed)
+    return f"learned|{language_name}|{n_train}|{max_len}|{seed}"
+
+
+def _iter_words(alphabet: Tuple[str, ...], max_len: int) -> Iterator[str]:
+    """Yields all words over alphabet with lengths 0..max_len.
+
+    Words are produced in the same lexicographic order as itertools.product,
+    without building the whole list. Full levels are built by extending the
+    previous one while they hold at most _SUFFIX_BLOCK_WORDS words; longer
+    words are a product() prefix joined with every word of that last level,
+    so memory stays bounded by the block size.
+    """
+    yield ""
+    suffixes = [""]
+    depth = 0
+    for length in range(1, max_len + 1):
+        if len(suffixes) * len(alphabet) <= _SUFFIX_BLOCK_WORDS:
+            suffixes = [w + a for w in suffixes for a in alphabet]
+            depth = length
+            yield from suffixes
+            continue
+        for prefix in product(alphabet, repeat=length - depth):
+            p = "".join(prefix)
+            for w in suffixes:
+                yield p + w
 
 
 
@@ -80,30 +173,48 @@ def train_language(language_name: str, n_train: int = 2000, max_len: int = 10, s
     teacher, learned, words, _labels = _ensure_trained(language_name, n_train=n_train, max_len=max_len, seed=seed)
 
     # accuracy on training set = agreement teacher vs learned
-    correct = 0
-    for w in words:
-        if teacher.accepts(w) == learned.accepts(w):
-            correct += 1
+    correct = teacher.count_agreements(learned, words)
     acc = correct / len(words) if words else 0.0
 
     # approximate equivalence on random test
-    lang = get_language(language_name)
-    test_words = random_word_generator(1000, min_len=1, max_len=max_len, alphabet=lang.ALPHABET)
-    eq = all(teacher.accepts(w) == learned.accepts(w) for w in test_words)
+    _words, test_words = _train_test_words(language_name, n_train, max_len, seed)
+    eq = teacher.agrees_on(learned, test_words)
 
     return acc, eq
 
 
 def teacher_accepts(language_name: str, word: str):
-    """Returns True if the teacher DFA accepts the word."""
-    teacher = _get_teacher(language_name)
-    return teacher.accepts(word)
+    """Returns True if the teacher DFA accepts the word (cached per normal form)."""
+    return _get_teacher(language_name).accepts(word)
+
+
+def normal_form_agrees_with_teacher(language_name: str, max_len: int = 6):
+    """Checks the language's normal_form against a freshly built teacher DFA.
+
+    A new CachedAcceptor answers every word up to max_len, over the alphabet
+    plus the foreign symbol "c", from the first word of its normal form;
+    all answers must match teacher_dfa().accepts.
+    """
+    teacher = get_language(language_name).teacher_dfa()
+    cached = CachedAcceptor(teacher, _normal_form_fn(language_name))
+    alphabet = tuple(teacher.alphabet) + ("c",)
+    return all(cached.accepts(w) == teacher.accepts(w) for w in _iter_words(alphabet, int(max_len)))
+
+
+def teacher_accepts_symbols(language_name: str, *symbols):
+    """Returns True if the teacher DFA accepts the word given as a list of symbols."""
+    return _teacher_dfa_cached(language_name).accepts(list(symbols))
+
+
+def teacher_agrees_on_symbols(language_name: str, *symbols):
+    """Compares the teacher DFA with itself on the word given as a tuple of symbols."""
+    teacher = _teacher_dfa_cached(language_name)
+    return teacher.agrees_on(teacher, [tuple(symbols)])
 
 
 def learned_accepts(language_name: str, word: str, n_train: int = 2000, max_len: int = 10, seed: int = 123):
     """Returns True if the learned DFA accepts the word."""
-    teacher, learned, _words, _labels = _ensure_trained(language_name, n_train=n_train, max_len=max_len, seed=seed)
-    return learned.accepts(word)
+    return _accepts(_learned_id(language_name, n_train, max_len, seed), word)
 
 
 def compare_dfas_exhaustive(language_name: str, max_len: int = 8, n_train: int = 2000, seed: int = 123):
@@ -114,19 +225,172 @@ def compare_dfas_exhaustive(language_name: str, max_len: int = 8, n_train: int =
     lang = get_language(language_name)
     teacher, learned, _words, _labels = _ensure_trained(language_name, n_train=n_train, max_len=max(max_len, 1), seed=seed)
 
-    for w in _all_words(lang.ALPHABET, max_len):
-        if teacher.accepts(w) != learned.accepts(w):
-            return False
-    return True
+    return teacher.agrees_on(learned, _iter_words(lang.ALPHABET, max_len))
 
 
-def dfa_is_complete(language_name: str, n_train: int = 2000, max_len: int = 10, seed: int = 123):
-    """Checks that the learned DFA has a defined transition for every (state, symbol)."""
+def tree_agrees_with_learned_dfa(language_name: str, max_len: int = 8, n_train: int = 2000, seed: int = 123):
+    """Rebuilds the decision tree of the trained language and checks that
+    predict_tree on the word features matches the learned DFA on ALL words
+    up to max_len (at most the training max_len of 10)."""
     lang = get_language(language_name)
-    _teacher, learned, _words, _labels = _ensure_trained(language_name, n_train=n_train, max_len=max_len, seed=seed)
+    _teacher, learned, words, labels = _ensure_trained(language_name, n_train=n_train, seed=seed)
+    tree = build_tree(words, labels, max_depth=12)
+    return all(_predict_tree(tree, _extract_features(w)) == learned.accepts(w)
+               for w in _iter_words(lang.ALPHABET, int(max_len)))
+
+
+def count_injected_false_positives(fp_rate, n_words: int = 10, seed: int = 1):
+    """Labels n_words negative even_a words with label_words_with_fp and
+    returns how many of them were flipped to True."""
+    teacher = _teacher_dfa_cached("even_a")
+    data = _label_words_with_fp(teacher, ["a"] * int(n_words), fp_rate=float(fp_rate), seed=int(seed))
+    return sum(1 for _w, label in data if label)
+
+
+def primitive_state_mismatches(max_len: int = 7):
+    """Folds every word over (a, b) up to max_len through update_primitive_state
+    and counts words where features_from_primitive_state differs from
+    extract_features. Covers every (last_char, symbol) combination of the
+    DFA construction."""
+    mismatches = 0
+    for word in _iter_words(("a", "b"), int(max_len)):
+        state = _ttd.initial_primitive_state()
+        for symbol in word:
+            state = _ttd.update_primitive_state(state, _ttd.symbol_code(symbol))
+        if _ttd.features_from_primitive_state(state) != _extract_features(word):
+            mismatches += 1
+    return mismatches
+
+
+def _dfa_from_spec(spec: str):
+    """Builds a DFA over (a, b) from a spec like "start=0 accept=1,2 0-a->1 1-b->1".
+
+    States are ints; "start=" may be omitted (no start state) and every
+    state mentioned anywhere is added.
+    """
+    d = _DFA(alphabet=("a", "b"))
+    start = None
+    for token in spec.split():
+        if token.startswith("start="):
+            start = int(token[len("start="):])
+        elif token.startswith("accept="):
+            for q in token[len("accept="):].split(","):
+                if q:
+                    d.add_state(int(q), accepting=True)
+        else:
+            q_old, rest = token.split("-", 1)
+            symbol, q_new = rest.split("->")
+            d.add_transition(int(q_old), symbol, int(q_new))
+    if start is not None:
+        d.set_start(start)
+    return d
+
+
+def _same_language(d1, d2, max_len: int) -> bool:
+    """Compares two DFAs on all words up to max_len, including a foreign symbol."""
+    return d1.agrees_on(d2, _iter_words(("a", "b", "c"), max_len))
+
+
+def minimized_state_count(spec: str):
+    """Number of states of the minimized DFA built from spec."""
+    return len(_dfa_from_spec(spec).minimize().states)
+
+
+def minimized_accepts(spec: str, word: str):
+    """Returns True if the minimized DFA built from spec accepts the word."""
+    return _dfa_from_spec(spec).minimize().accepts(word)
+
+
+def minimized_has_start_state(spec: str):
+    """Returns True if the minimized DFA built from spec has a start state."""
+    return _dfa_from_spec(spec).minimize().start_state is not None
+
+
+def minimize_preserves_language(spec: str, max_len: int = 6):
+    """Checks that minimizing the DFA built from spec keeps its language."""
+    d = _dfa_from_spec(spec)
+    return _same_language(d, d.minimize(), int(max_len))
+
+
+def dfas_agree_up_to(spec1: str, spec2: str, max_len, min_len=0):
+    """DFA.agrees_up_to on the DFAs built from spec1 and spec2."""
+    return _dfa_from_spec(spec1).agrees_up_to(_dfa_from_spec(spec2), int(max_len), int(min_len))
+
 
-    for s in learned.states:
-        for sym in lang.ALPHABET:
-            if learned.step(s, sym) is None:
-                return False
+def transition_of(spec: str, state, symbol: str):
+    """Reads transitions[state][symbol] of the DFA built from spec (None if missing)."""
+    return _dfa_from_spec(spec).transitions[int(state)].get(symbol)
+
+
+def transitions_are_read_only(spec: str):
+    """Returns True if writes to the transitions mapping and to its rows
+    both raise TypeError."""
+    transitions = _dfa_from_spec(spec).transitions
+    for target, key, value in ((transitions, 99, {}), (next(iter(transitions.values())), "a", 0)):
+        try:
+            target[key] = value
+        except TypeError:
+            continue
+        return False
     return True
+
+
+def _int_parity_dfa():
+    """DFA over the int alphabet (0, 1) accepting words with an even number
+    of 0s; states 0 and 2 are equivalent, so minimizing merges them."""
+    d = _DFA(alphabet=(0, 1))
+    for q, (on0, on1) in enumerate(((1, 0), (2, 1), (1, 2))):
+        d.add_transition(q, 0, on0)
+        d.add_transition(q, 1, on1)
+    d.add_state(0, accepting=True)
+    d.add_state(2, accepting=True)
+    d.set_start(0)
+    return d
+
+
+def int_alphabet_accepts(*symbols):
+    """Walks the int-alphabet parity DFA and its minimized form on the word
+    given as symbols (converted to int); returns both verdicts."""
+    word = [int(a) for a in symbols]
+    d = _int_parity_dfa()
+    return d.accepts(word), d.minimize().accepts(word)
+
+
+def int_alphabet_minimized_state_count():
+    """Number of states of the minimized int-alphabet parity DFA."""
+    return len(_int_parity_dfa().minimize().states)
+
+
+def random_minimize_failures(n_dfas: int = 300, n_states: int = 6, seed: int = 1):
+    """Minimizes random partial DFAs (missing transitions, unreachable states,
+    sometimes no start state) and returns how many of them lost their
+    language or were not minimal (minimizing twice must not shrink further).
+    """
+    rng = random.Random(int(seed))
+    n_states = int(n_states)
+    failures = 0
+    for _ in range(int(n_dfas)):
+        d = _DFA(alphabet=("a", "b"))
+        for q in range(n_states):
+            d.add_state(q, accepting=rng.random() < 0.4)
+        for q in range(n_states):
+            for a in ("a", "b"):
+                if rng.random() < 0.7:
+                    d.add_transition(q, a, rng.randrange(n_states))
+        if rng.random() < 0.9:
+            d.set_start(rng.randrange(n_states))
+        m = d.minimize()
+        if not _same_language(d, m, 6) or len(m.minimize().states) != len(m.states):
+            failures += 1
+    return failures
+
+
+def dfa_is_complete(language_name: str, n_train: int = 2000, max_len: int = 10, seed: int = 123):
+    """Checks that the learned DFA has a defined transition for every (state, symbol).
+
+    tree_to_dfa minimizes its result, which turns the rejecting max_len
+    states into an explicit sink, so the learned DFAs of the bundled
+    languages are complete.
+    """
+    _teacher, learned, _words, _labels = _ensure_trained(language_name, n_train=n_train, max_len=max_len, seed=seed)
+    return learned.is_complete()
@@ -16,12 +16,15 @@ from generator import (
     generate_labeled_words,
     label_words_with_fp,
     label_words_with_fp_verbose,
-    random_word_generator,
 )
 from decision_tree import build_tree
 from tree_to_dfa import tree_to_dfa
 
 
+# (words, labels, alphabet, max_len) -> learned DFA
+_PIPELINE_CACHE = {}
+
+
 def run_experiment(words, labels, true_dfa, alphabet, max_len: int, title: str):
     """Train -> convert -> evaluate for a single dataset.
 
@@ -31,35 +34,45 @@ def run_experiment(words, labels, true_dfa, alphabet, max_len: int, title: str):
     """
     print(f"\n{title}")
 
-    # 1) Train decision tree
-    print("Training decision tree...")
-    tree = build_tree(words, labels, max_depth=12)
-    print("Tree trained.")
-
-    # 2) Convert decision tree to DFA
-    print("Converting tree to DFA...")
-    learned_dfa = tree_to_dfa(tree, max_len=max_len, alphabet=alphabet)
-    print("Conversion completed.")
+    key = (tuple(words), tuple(labels), tuple(alphabet), max_len)
+    learned_dfa = _PIPELINE_CACHE.get(key)
+    if learned_dfa is not None:
+        print("Reusing DFA learned from identical training data.")
+    else:
+        # 1) Train decision tree
+        print("Training decision tree...")
+        tree = build_tree(words, labels, max_depth=12)
+        print("Tree trained.")
+
+        # 2) Convert decision tree to DFA
+        print("Converting tree to DFA...")
+        learned_dfa = tree_to_dfa(tree, max_len=max_len, alphabet=alphabet)
+        print("Conversion completed.")
+        _PIPELINE_CACHE[key] = learned_dfa
 
     # 3) Agreement vs provided labels (can be noisy)
-    correct = sum(learned_dfa.accepts(w) == lbl for w, lbl in zip(words, labels))
-    train_acc = correct / len(words) if words else 0.0
+    predictions = learned_dfa.accepts_many(words)
+    train_acc = prediction_accuracy(predictions, labels)
     print(f"Training accuracy (vs provided labels): {train_acc:.3f}")
 
-    # 4) Approximate equivalence vs true teacher DFA
-    test_words = random_word_generator(2000, min_len=1, max_len=max_len, alphabet=alphabet)
-    eq = all(learned_dfa.accepts(w) == true_dfa.accepts(w) for w in test_words)
-    print(f"Equivalent to true DFA (random test): {eq}")
+    # 4) Equivalence vs true teacher DFA on every word the generator can
+    #    produce (lengths 1..max_len), checked over state pairs instead of
+    #    a random sample of words
+    eq = learned_dfa.agrees_up_to(true_dfa, max_len, min_len=1)
+    print(f"Equivalent to true DFA (all words up to max_len): {eq}")
+
+    return learned_dfa, train_acc, eq, predictions
+
 
-    return learned_dfa, train_acc, eq
+def prediction_accuracy(predictions, labels) -> float:
+    """Fraction of predictions equal to the labels (no DFA walks)."""
+    correct = sum(p == lbl for p, lbl in zip(predictions, labels))
+    return correct / len(labels) if labels else 0.0
 
 
 def compute_accuracy(true_dfa, learned_dfa, words) -> float:
     """Computes acceptance agreement on a word list."""
-    correct = 0
-    for w in words:
-        if learned_dfa.accepts(w) == true_dfa.accepts(w):
-            correct += 1
+    correct = learned_dfa.count_agreements(true_dfa, words)
     return correct / len(words) if words else 0.0
 
 
@@ -90,7 +103,7 @@ def run(
     print(f"Language: {language}")
     print(f"Generated {len(words)} training samples.")
 
-    learned_dfa, _train_acc_noisy, eq = run_experiment(
+    learned_dfa, _train_acc_noisy, eq, predictions = run_experiment(
         words=words,
         labels=labels,
         true_dfa=true_dfa,
@@ -100,8 +113,9 @@ def run(
     )
 
     # For compatibility with earlier outputs, we still report "Accuracy" as
-    # agreement teacher vs learned on the training set.
-    train_acc = compute_accuracy(true_dfa, learned_dfa, words)
+    # agreement teacher vs learned on the training set. The clean labels are
+    # the teacher's verdicts, so the learned predictions are simply reused.
+    train_acc = prediction_accuracy(predictions, labels)
     print(f"Accuracy: {train_acc:.3f}")
     print(f"Equivalent: {eq}")
 
@@ -127,7 +141,7 @@ def run(
             train_labels_v = [noisy for _, _, noisy in data_verbose]
             true_labels_v = [true for _, true, _ in data_verbose]
 
-            learned_fp, _acc, _eq = run_experiment(
+            _learned_fp, _acc, _eq, preds_v = run_experiment(
                 words=words_v,
                 labels=train_labels_v,
                 true_dfa=true_dfa,
@@ -137,8 +151,7 @@ def run(
             )
 
             tp = tn = fp = fn = 0
-            for w, true_lbl in zip(words_v, true_labels_v):
-                pred = learned_fp.accepts(w)
+            for pred, true_lbl in zip(preds_v, true_labels_v):
                 if pred and true_lbl:
                     tp += 1
                 elif (not pred) and (not true_lbl):
@@ -32,167 +32,257 @@ References:
 """
 
 
-from collections import deque
 from dfa import DFA
-from decision_tree import Node
+# predict_tree is re-exported for callers that imported it from here
+from decision_tree import predict_tree  # noqa: F401
+
+
+# Primitive state packed into a single int (bit fields, low to high):
+#   has_bb, has_ba, has_ab, has_aa        1 bit each
+#   last_char, prev_char, first_char      2 bits each (symbol codes below)
+#   b_count, a_count                      COUNT_BITS each
+#   length                                remaining high bits
+HAS_BB = 1 << 0
+HAS_BA = 1 << 1
+HAS_AB = 1 << 2
+HAS_AA = 1 << 3
+LAST_SHIFT = 4
+PREV_SHIFT = 6
+FIRST_SHIFT = 8
+COUNT_BITS = 16
+B_SHIFT = 10
+A_SHIFT = B_SHIFT + COUNT_BITS
+LENGTH_SHIFT = A_SHIFT + COUNT_BITS
+CHAR_MASK = 3
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+# symbol codes: 0 = no character (empty prefix), other symbols share code 3
+NO_CHAR = 0
+CHAR_A = 1
+CHAR_B = 2
+CHAR_OTHER = 3
+
+# pattern flag set by the bigram (last_char, symbol), indexed by last * 4 + symbol
+PAIR_FLAG = [0] * 16
+PAIR_FLAG[CHAR_A * 4 + CHAR_A] = HAS_AA
+PAIR_FLAG[CHAR_A * 4 + CHAR_B] = HAS_AB
+PAIR_FLAG[CHAR_B * 4 + CHAR_A] = HAS_BA
+PAIR_FLAG[CHAR_B * 4 + CHAR_B] = HAS_BB
+
+
+def symbol_code(symbol):
+    """
+    Returns the 2-bit code of an alphabet symbol used in primitive states.
+    """
+    if symbol == "a":
+        return CHAR_A
+    if symbol == "b":
+        return CHAR_B
+    return CHAR_OTHER
 
 
 def initial_primitive_state():
     """
     Primitive state describes what we know about the prefix:
         length, a_count, b_count,
-        first_char, last_char,
+        first_char, prev_char, last_char,
         has_aa, has_ab, has_ba, has_bb
+    packed into one int (see the bit layout above); the empty prefix is 0.
     """
-    return {
-        "length": 0,
-        "a_count": 0,
-        "b_count": 0,
-        "first_char": None,
-        "prev_char": None,
-        "last_char": None,
-        "has_aa": 0,
-        "has_ab": 0,
-        "has_ba": 0,
-        "has_bb": 0,
-    }
+    return 0
 
 
-def update_primitive_state(state, symbol):
+def update_primitive_state(state, code):
     """
-    Updates primitive state after reading one symbol ('a' or 'b').
+    Updates primitive state after reading one symbol, given by its code
+    (see symbol_code). Pure bit arithmetic on the packed int:
+      - length grows by 1, a_count for 'a' and b_count otherwise
+        ('b' and any other symbol count as b),
+      - first_char is set if the prefix was empty (no last_char),
+      - the pattern flag of the bigram (last_char, symbol) is set,
+      - last_char moves to prev_char and the symbol becomes last_char.
+    The constants come from symbol_step, which the DFA construction uses inline.
     """
-    new = dict(state)
-    length = new["length"]
-    last = new["last_char"]
+    inc, clear, set_by_last = _SYMBOL_STEPS[code]
+    return (state + inc) & ~clear | set_by_last[(state >> LAST_SHIFT) & CHAR_MASK]
 
-    # length
-    length += 1
-    new["length"] = length
 
-    # first_char
-    if length == 1:
-        new["first_char"] = symbol
-
-    # counts
-    if symbol == "a":
-        new["a_count"] += 1
-    else:
-        new["b_count"] += 1
-
-    # previous character (needed for suffix bigram features)
-    new["prev_char"] = last
-
-    # patterns based on (last_char, symbol)
-    if last is not None:
-        pair = last + symbol
-        if pair == "aa":
-            new["has_aa"] = 1
-        elif pair == "ab":
-            new["has_ab"] = 1
-        elif pair == "ba":
-            new["has_ba"] = 1
-        elif pair == "bb":
-            new["has_bb"] = 1
-
-    # last_char
-    new["last_char"] = symbol
-
-    return new
-
-def features_from_primitive_state(state):
-    """
-    Reconstructs the same feature dictionary that extract_features(word)
-    would produce, but using only primitive state (no full word needed).
-    """
-    length = state["length"]
-    a_count = state["a_count"]
-    b_count = state["b_count"]
-    first_char = state["first_char"]
-    prev_char = state["prev_char"]
-    last_char = state["last_char"]
+_LENGTH = f"(s >> {LENGTH_SHIFT})"
+_A_COUNT = f"(s >> {A_SHIFT} & {COUNT_MASK})"
+_B_COUNT = f"(s >> {B_SHIFT} & {COUNT_MASK})"
+_FIRST = f"(s >> {FIRST_SHIFT} & {CHAR_MASK})"
+_LAST = f"(s >> {LAST_SHIFT} & {CHAR_MASK})"
+_SUFFIX = f"(s >> {LAST_SHIFT} & 15)"  # (prev_char << 2) | last_char
 
-    features = {}
 
+# Feature name -> Python expression computing that feature from a packed
+# state bound to `s` (flags evaluate to bools). Matches the keys (and order)
+# of extract_features(word).
+FEATURE_EXPRS = {
     # length & mods
-    features["length"] = length
-    features["length_mod2"] = length % 2
-    features["length_mod3"] = length % 3
+    "length": _LENGTH,
+    "length_mod2": f"({_LENGTH} % 2)",
+    "length_mod3": f"({_LENGTH} % 3)",
 
     # counts & parities
-    features["a_count"] = a_count
-    features["b_count"] = b_count
-    features["a_parity"] = a_count % 2
-    features["b_parity"] = b_count % 2
-    features["a_mod3"] = a_count % 3
-    features["b_mod3"] = b_count % 3
+    "a_count": _A_COUNT,
+    "b_count": _B_COUNT,
+    "a_parity": f"({_A_COUNT} % 2)",
+    "b_parity": f"({_B_COUNT} % 2)",
+    "a_mod3": f"({_A_COUNT} % 3)",
+    "b_mod3": f"({_B_COUNT} % 3)",
 
     # start/end
-    features["starts_with_a"] = 1 if first_char == "a" else 0
-    features["starts_with_b"] = 1 if first_char == "b" else 0
-    features["ends_with_a"] = 1 if last_char == "a" else 0
-    features["ends_with_b"] = 1 if last_char == "b" else 0
+    "starts_with_a": f"({_FIRST} == {CHAR_A})",
+    "starts_with_b": f"({_FIRST} == {CHAR_B})",
+    "ends_with_a": f"({_LAST} == {CHAR_A})",
+    "ends_with_b": f"({_LAST} == {CHAR_B})",
 
     # patterns
-    features["has_aa"] = state["has_aa"]
-    features["has_ab"] = state["has_ab"]
-    features["has_ba"] = state["has_ba"]
-    features["has_bb"] = state["has_bb"]
-
-    # suffix bigram flags
-    if prev_char is None or last_char is None:
-        features["ends_with_aa"] = 0
-        features["ends_with_ab"] = 0
-        features["ends_with_ba"] = 0
-        features["ends_with_bb"] = 0
-    else:
-        last2 = prev_char + last_char
-        features["ends_with_aa"] = 1 if last2 == "aa" else 0
-        features["ends_with_ab"] = 1 if last2 == "ab" else 0
-        features["ends_with_ba"] = 1 if last2 == "ba" else 0
-        features["ends_with_bb"] = 1 if last2 == "bb" else 0
+    "has_aa": f"(s & {HAS_AA} != 0)",
+    "has_ab": f"(s & {HAS_AB} != 0)",
+    "has_ba": f"(s & {HAS_BA} != 0)",
+    "has_bb": f"(s & {HAS_BB} != 0)",
+
+    # suffix bigram flags (a missing prev_char never matches)
+    "ends_with_aa": f"({_SUFFIX} == {CHAR_A << 2 | CHAR_A})",
+    "ends_with_ab": f"({_SUFFIX} == {CHAR_A << 2 | CHAR_B})",
+    "ends_with_ba": f"({_SUFFIX} == {CHAR_B << 2 | CHAR_A})",
+    "ends_with_bb": f"({_SUFFIX} == {CHAR_B << 2 | CHAR_B})",
 
     # relations between counts
-    features["more_a_than_b"] = 1 if a_count > b_count else 0
-    features["equal_a_b"] = 1 if a_count == b_count else 0
+    "more_a_than_b": f"({_A_COUNT} > {_B_COUNT})",
+    "equal_a_b": f"({_A_COUNT} == {_B_COUNT})",
+}
+
+# Feature name -> accessor reading that feature straight from a packed state.
+FEATURE_FNS = {name: eval(f"lambda s: int({expr})") for name, expr in FEATURE_EXPRS.items()}
+
+_LENGTH_BITS = -1 << LENGTH_SHIFT
+_A_BITS = COUNT_MASK << A_SHIFT
+_B_BITS = COUNT_MASK << B_SHIFT
+_FIRST_BITS = CHAR_MASK << FIRST_SHIFT
+_LAST_BITS = CHAR_MASK << LAST_SHIFT
+_SUFFIX_BITS = 15 << LAST_SHIFT
+
+# Feature name -> bits of the packed state that the feature reads.
+FEATURE_BITS = {
+    "length": _LENGTH_BITS,
+    "length_mod2": _LENGTH_BITS,
+    "length_mod3": _LENGTH_BITS,
+    "a_count": _A_BITS,
+    "b_count": _B_BITS,
+    "a_parity": _A_BITS,
+    "b_parity": _B_BITS,
+    "a_mod3": _A_BITS,
+    "b_mod3": _B_BITS,
+    "starts_with_a": _FIRST_BITS,
+    "starts_with_b": _FIRST_BITS,
+    "ends_with_a": _LAST_BITS,
+    "ends_with_b": _LAST_BITS,
+    "has_aa": HAS_AA,
+    "has_ab": HAS_AB,
+    "has_ba": HAS_BA,
+    "has_bb": HAS_BB,
+    "ends_with_aa": _SUFFIX_BITS,
+    "ends_with_ab": _SUFFIX_BITS,
+    "ends_with_ba": _SUFFIX_BITS,
+    "ends_with_bb": _SUFFIX_BITS,
+    "more_a_than_b": _A_BITS | _B_BITS,
+    "equal_a_b": _A_BITS | _B_BITS,
+}
+
+# generated predicates nest one block per tree level; deeper trees are
+# evaluated with predict_primitive_state instead (the parser limits indentation)
+MAX_COMPILED_DEPTH = 80
+
+
+def symbol_step(code):
+    """
+    Precomputes the update of a primitive state by one symbol code as constants:
+        new = (state + inc) & ~clear | set_by_last[last_char of state]
+    (last_char == NO_CHAR only for the empty prefix, whose entry also sets
+    first_char). Returns (inc, clear, set_by_last).
+    """
+    inc = (1 << LENGTH_SHIFT) + (1 << (A_SHIFT if code == CHAR_A else B_SHIFT))
+    clear = (CHAR_MASK << PREV_SHIFT) | (CHAR_MASK << LAST_SHIFT)
+    set_by_last = [PAIR_FLAG[last * 4 + code] | (last << PREV_SHIFT) | (code << LAST_SHIFT)
+                   for last in range(4)]
+    set_by_last[NO_CHAR] |= code << FIRST_SHIFT
+    return inc, clear, set_by_last
 
-    return features
 
+# symbol code -> symbol_step(code), used by update_primitive_state
+_SYMBOL_STEPS = [symbol_step(code) for code in range(4)]
 
-def predict_tree(node, features):
+
+def features_from_primitive_state(state):
     """
-    Evaluates the decision tree on a feature dictionary.
+    Reconstructs the same feature dictionary that extract_features(word)
+    would produce, but using only primitive state (no full word needed).
+    Only needed when the full dict is required; tree evaluation reads single
+    features through FEATURE_FNS (see predict_primitive_state).
     """
-    while True:
-        # leaf?
-        if node.value is not None:
-            return bool(node.value)
+    return {name: fn(state) for name, fn in FEATURE_FNS.items()}
 
-        # internal node
-        val = features[node.feature]
-        if val <= node.threshold:
+
+def predict_primitive_state(node, state):
+    """
+    Evaluates the decision tree on a packed primitive state, computing only
+    the features on the root-to-leaf path.
+    """
+    while node.value is None:
+        if FEATURE_FNS[node.feature](state) <= node.threshold:
             node = node.left
         else:
             node = node.right
+    return bool(node.value)
 
 
-
-def primitive_key(state):
+def tree_state_bits(root):
+    """
+    Returns the mask of packed-state bits read by any split of the tree.
+    Two states that agree on these bits get the same prediction.
     """
-    Converts primitive state dict into a hashable key for state_map.
+    bits = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.value is None:
+            bits |= FEATURE_BITS[node.feature]
+            stack.append(node.left)
+            stack.append(node.right)
+    return bits
+
+
+def compile_state_predicate(root):
     """
-    return (
-        state["length"],
-        state["a_count"],
-        state["b_count"],
-        state["first_char"],
-        state["prev_char"],
-        state["last_char"],
-        state["has_aa"],
-        state["has_ab"],
-        state["has_ba"],
-        state["has_bb"],
-    )
+    Generates straight-line Python source for the tree, with the feature
+    expressions of FEATURE_EXPRS inlined as nested if/else blocks, and
+    compiles it into a function predicate(state) -> bool.
+    Falls back to predict_primitive_state for very deep trees.
+    """
+    lines = ["def predicate(s):"]
+    stack = [(root, 1)]
+    while stack:
+        item, depth = stack.pop()
+        if depth > MAX_COMPILED_DEPTH:
+            return lambda state: predict_primitive_state(root, state)
+
+        pad = "    " * depth
+        if isinstance(item, str):
+            lines.append(pad + item)
+        elif item.value is not None:
+            lines.append(f"{pad}return {bool(item.value)}")
+        else:
+            lines.append(f"{pad}if {FEATURE_EXPRS[item.feature]} <= {item.threshold!r}:")
+            stack.append((item.right, depth + 1))
+            stack.append(("else:", depth))
+            stack.append((item.left, depth + 1))
+
+    namespace = {}
+    exec(compile("\n".join(lines), "<decision tree>", "exec"), namespace)
+    return namespace["predicate"]
 
 
 def tree_to_dfa(root, max_len=10, alphabet=("a", "b")):
@@ -201,50 +291,66 @@ def tree_to_dfa(root, max_len=10, alphabet=("a", "b")):
     up to given max_len.
 
     State of DFA encodes:
-      - primitive prefix statistics
-    Acceptance = decision_tree(features_from_primitive_state(state)).
+      - primitive prefix statistics (packed into an int)
+    Acceptance = decision_tree(state), evaluated by the generated predicate
+    from compile_state_predicate.
+    The result is minimized (Hopcroft), so states are renumbered 0..n-1.
+
+    Prefixes of length max_len get no outgoing transitions, so longer words
+    are rejected. Minimization merges the rejecting max_len states with the
+    implicit dead state, and that block is kept as an explicit rejecting
+    sink: whenever the tree rejects some prefix of length max_len, the
+    returned DFA is complete (every state has a transition on every symbol).
     """
-    dfa = DFA(alphabet=alphabet)
-
-    state_map = {}  # primitive_key -> state_id
-    queue = deque()
-    next_id = 0
-
-    def ensure_state(state):
-        nonlocal next_id
-        key = primitive_key(state)
-        if key in state_map:
-            return state_map[key]
-
-        sid = next_id
-        next_id += 1
-        state_map[key] = sid
-
-        # compute features and mark accepting
-        features = features_from_primitive_state(state)
-        is_accepting = predict_tree(root, features)
-        dfa.add_state(sid, accepting=is_accepting)
-
-        queue.append(state)
-        return sid
+    if max_len > COUNT_MASK:
+        raise ValueError(f"max_len {max_len} exceeds the supported maximum {COUNT_MASK}")
+
+    codes = [symbol_code(sym) for sym in alphabet]
+    k = len(alphabet)
+
+    # hash-consing: every distinct packed state gets one id, and the tree is
+    # evaluated at most once for it (when the id is allocated)
+    predicate = compile_state_predicate(root)
+    tree_bits = tree_state_bits(root)
+    state_map = {}  # packed primitive state -> state_id
+    # the DFA is built at the end from a dense table indexed by state id
+    # and symbol index, table[sid][j] (-1 for states that are not expanded)
+    table = []
+    accepting_of = []
 
     # initial state: empty prefix
     init_prim = initial_primitive_state()
-    start_id = ensure_state(init_prim)
-    dfa.set_start(start_id)
-
-    # BFS over reachable primitive states (up to max_len)
-    while queue:
-        state = queue.popleft()
-        sid = state_map[primitive_key(state)]
-
-        # do not expand beyond max_len (training/test generator uses this bound)
-        if state["length"] >= max_len:
-            continue
-
-        for sym in alphabet:
-            new_state = update_primitive_state(state, sym)
-            nid = ensure_state(new_state)
-            dfa.add_transition(sid, sym, nid)
-
-    return dfa
+    start_id = 0
+    state_map[init_prim] = start_id
+    table.append([-1] * k)
+    accepting_of.append(predicate(init_prim))
+
+    # Level-synchronous BFS: every symbol adds 1 to the length, so all states
+    # discovered from the frontier of depth d have depth d + 1 and form the
+    # next frontier. Levels max_len are not expanded (training/test generator
+    # uses this bound).
+    # update_primitive_state is applied inline with the symbol_step constants
+    steps = [symbol_step(code) for code in codes]
+    frontier = [(init_prim, start_id, accepting_of[start_id])]
+    for _depth in range(max_len):
+        next_frontier = []
+        for state, sid, accepting in frontier:
+            row = table[sid]
+            last = (state >> LAST_SHIFT) & CHAR_MASK
+            for j, (inc, clear, set_by_last) in enumerate(steps):
+                new_state = (state + inc) & ~clear | set_by_last[last]
+                nid = state_map.get(new_state)
+                if nid is None:
+                    # if no bit read by the tree changed, the parent's decision holds
+                    new_accepting = predicate(new_state) if (new_state ^ state) & tree_bits else accepting
+                    nid = len(table)
+                    state_map[new_state] = nid
+                    table.append([-1] * k)
+                    accepting_of.append(new_accepting)
+                    next_frontier.append((new_state, nid, new_accepting))
+                row[j] = nid
+        frontier = next_frontier
+
+    dfa = DFA.from_table(alphabet, table, accepting_of, start=start_id)
+    # many prefixes end up behaviourally equivalent under the tree
+    return dfa.minimize()